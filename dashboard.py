@@ -7,20 +7,45 @@ Generates a complete HTML dashboard with:
 - Statistics summary
 - Alert filters
 - Paginated event table
-- Integrated PyVis provenance graph
+- Integrated vis.js provenance graph
 - Multi-color alert badges (spoofing, masking, TLS violations)
 
 Output:
-    dashboard.html
+    dashboard.html       (static shell, only rewritten when it changes)
+    dashboard_data.js    (stats + event rows, rewritten on every run)
+    graph_component.html
 """
 
-import json
+import functools
+import math
+import os
+import pickle
+import re
+import time
+from collections import Counter
+from itertools import chain
 from pathlib import Path
-from datetime import datetime
-from pyvis.network import Network
+
+try:
+    from orjson import dumps, loads
+except ImportError:
+    from json import dumps as _json_dumps, loads
+
+    def dumps(obj):
+        return _json_dumps(obj).encode()
 
 AUDIT_LOG = "audit_log.jsonl"
 OUTPUT_HTML = "dashboard.html"
+OUTPUT_DATA = "dashboard_data.js"
+DASHBOARD_SHELL = Path(__file__).with_name("dashboard_shell.html")
+GRAPH_HTML = "graph_component.html"
+GRAPH_SHELL = Path(__file__).with_name("graph_shell.html")
+
+# Stats and graph from the previous run, reused while the log is only appended to
+CACHE_DIR = Path(".cache")
+CACHE_META = CACHE_DIR / "dashboard_cache.json"
+CACHE_GRAPH = CACHE_DIR / "graph.pkl"
+CACHE_VERSION = 4
 
 # Color map for alerts / states
 COLOR_MAP = {
@@ -31,6 +56,38 @@ COLOR_MAP = {
     "event": "#3b82f6"          # blue
 }
 
+# Bit per alert type in a table row's filter mask
+ALERT_BITS = {"spoofing": 1, "masking": 2, "tls_violation": 4}
+
+# Table rows without alerts carry this bit instead, so "ok" can be filtered too
+OK_BIT = 8
+FILTER_BITS = {"ok": OK_BIT, **ALERT_BITS}
+
+# Precomputed layout: shared state/alert hubs on an inner sunflower spiral,
+# event nodes on an outer one, in order of appearance (pixels)
+HUB_SPACING = 70
+EVENT_RADIUS = 350
+EVENT_SPACING = 25
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+
+# vis.js network options; nodes are laid out up front, so physics stays off
+GRAPH_OPTIONS = {
+    "nodes": {"borderWidth": 1, "shape": "dot", "size": 12},
+    "edges": {"arrows": {"to": {"enabled": True}}},
+    "physics": {"enabled": False},
+}
+
+# ------------------------------------------------------------
+# Atomic File Output
+# ------------------------------------------------------------
+def write_atomic(path, data):
+    """Write bytes via a temp file, so a failed run never leaves a partial file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
 # ------------------------------------------------------------
 # Load Events
 # ------------------------------------------------------------
@@ -40,14 +97,25 @@ def load_events():
         print("[ERROR] audit_log.jsonl not found. Run ree.py | tee.py first.")
         return []
 
-    with open(AUDIT_LOG, "r") as f:
+    # tee.py appends in event_id order, so sorting is usually unnecessary
+    in_order = True
+    prev_id = 0
+
+    with open(AUDIT_LOG, "rb") as f:
         for line in f:
             try:
-                events.append(json.loads(line))
-            except:
+                event = loads(line)
+            except ValueError:
                 continue
 
-    events.sort(key=lambda x: x.get("event_id", 0))
+            event_id = event.get("event_id", 0)
+            if event_id < prev_id:
+                in_order = False
+            prev_id = event_id
+            events.append(event)
+
+    if not in_order:
+        events.sort(key=lambda x: x.get("event_id", 0))
     return events
 
 
@@ -55,39 +123,82 @@ def load_events():
 # Compute Stats
 # ------------------------------------------------------------
 def compute_stats(events):
-    stats = {"total": len(events), "ok": 0, "spoofing": 0, "masking": 0, "tls_violation": 0}
+    # Events without alerts count as a single "ok"
+    counts = Counter(chain.from_iterable(e.get("alerts") or ("ok",) for e in events))
+
+    return {
+        "total": len(events),
+        "ok": counts["ok"],
+        "spoofing": counts["spoofing"],
+        "masking": counts["masking"],
+        "tls_violation": counts["tls_violation"],
+    }
 
-    for e in events:
-        alerts = e.get("alerts", [])
-        if not alerts:
-            stats["ok"] += 1
-        for a in alerts:
-            if a in stats:
-                stats[a] += 1
 
-    return stats
+# ------------------------------------------------------------
+# Precompute Graph Layout
+# ------------------------------------------------------------
+def spiral_point(k, r0, spacing):
+    # k-th point of a sunflower spiral: even spacing, no overlaps, O(1) per point
+    r = r0 + spacing * math.sqrt(k)
+    a = k * GOLDEN_ANGLE
+    return r * math.cos(a), r * math.sin(a)
+
+
+def layout_graph(nodes, start=0):
+    """Give nodes[start:] fixed positions; earlier nodes keep theirs.
+
+    The graph is N event nodes around a handful of shared hubs, so a force
+    layout is unnecessary: positions depend only on each node's ordinal,
+    and nodes appended by a later run continue the same spirals.
+    """
+    events = sum(1 for n in nodes[:start] if n["id"].startswith("Event_"))
+    hubs = start - events
+
+    for n in nodes[start:]:
+        if n["id"].startswith("Event_"):
+            x, y = spiral_point(events, EVENT_RADIUS, EVENT_SPACING)
+            events += 1
+        else:
+            x, y = spiral_point(hubs, 0, HUB_SPACING)
+            hubs += 1
+
+        n["x"] = x
+        n["y"] = y
+        n["physics"] = False
+        n["fixed"] = True
 
 
 # ------------------------------------------------------------
-# Build PyVis Graph (cleaner, less cluttered)
+# Build Provenance Graph (cleaner, less cluttered)
 # ------------------------------------------------------------
-def build_graph(events):
-    net = Network(height="600px", width="100%", directed=True, bgcolor="#fafafa")
-
-    # Better layout settings
-    net.set_options("""
-    var options = {
-      "nodes": {"borderWidth": 1, "shape": "dot", "size": 12},
-      "edges": {"arrows": {"to": {"enabled": true}}},
-      "physics": {
-        "barnesHut": {
-          "gravitationalConstant": -4000,
-          "centralGravity": 0.2,
-          "springLength": 120
-        }
-      }
-    }
-    """)
+def to_script_json(obj):
+    # Keep untrusted labels (e.g. REE-supplied URLs) from closing the <script>
+    return dumps(obj).replace(b"</", b"<\\/")
+
+
+def build_graph(events, nodes=None, edges=None):
+    """Add `events` to the graph given by `nodes`/`edges` (in place) and write it out."""
+    # Node/edge dicts are built directly in vis.js format
+    nodes = [] if nodes is None else nodes
+    edges = [] if edges is None else edges
+    seen = {n["id"] for n in nodes}
+    start = len(nodes)
+
+    # Hot-loop lookups bound to locals once
+    seen_add = seen.add
+    node_append = nodes.append
+    edge_append = edges.append
+    color_event = COLOR_MAP["event"]
+    color_ok = COLOR_MAP["ok"]
+
+    def add_node(n_id, color, label=None, shape="dot"):
+        if n_id not in seen:
+            seen_add(n_id)
+            node_append({"id": n_id, "label": label or n_id, "color": color, "shape": shape})
+
+    def add_edge(source, to):
+        edge_append({"from": source, "to": to, "arrows": "to"})
 
     for e in events:
         evt = f"Event_{e['event_id']}"
@@ -96,227 +207,166 @@ def build_graph(events):
         network = f"net={e['network_attempt']}"
 
         # Event node
-        net.add_node(evt, color=COLOR_MAP["event"], label=evt)
+        add_node(evt, color_event)
 
         # Physical state node
-        net.add_node(physical, color="#0f766e")
-        net.add_edge(evt, physical)
+        add_node(physical, "#0f766e")
+        add_edge(evt, physical)
 
         # Reported state node
-        net.add_node(reported, color="#fbbf24")
-        net.add_edge(evt, reported)
+        add_node(reported, "#fbbf24")
+        add_edge(evt, reported)
 
         # Network attempt node
-        net.add_node(network, color="#fb923c")
-        net.add_edge(evt, network)
+        add_node(network, "#fb923c")
+        add_edge(evt, network)
 
-        # Alerts (multi-color properly)
+        # Alerts (multi-color properly), one shared node per alert type
         alerts = e.get("alerts", [])
         if not alerts:
-            ok_node = f"OK_{e['event_id']}"
-            net.add_node(ok_node, label="OK", color=COLOR_MAP["ok"], shape="box")
-            net.add_edge(evt, ok_node)
+            add_node("OK", color_ok, shape="box")
+            add_edge(evt, "OK")
         else:
             for a in alerts:
-                a_node = f"{a}_{e['event_id']}"
-                net.add_node(a_node, label=a.upper(), color=COLOR_MAP[a], shape="box")
-                net.add_edge(evt, a_node)
+                add_node(a, COLOR_MAP[a], label=a.upper(), shape="box")
+                add_edge(evt, a)
 
-    net.write_html("graph_component.html")
-    return "graph_component.html"
+    # Only nodes added by this call need a position
+    layout_graph(nodes, start)
+
+    # Fill the static shell in one pass, so labels are never re-scanned
+    data = {
+        b"NODES": to_script_json(nodes),
+        b"EDGES": to_script_json(edges),
+        b"OPTIONS": dumps(GRAPH_OPTIONS),
+    }
+    html = re.sub(rb"__(NODES|EDGES|OPTIONS)__", lambda m: data[m.group(1)], GRAPH_SHELL.read_bytes())
+
+    write_atomic(GRAPH_HTML, html)
+    return GRAPH_HTML
 
 
 # ------------------------------------------------------------
-# Event Table with Multi-Color Badges
+# Incremental Cache
 # ------------------------------------------------------------
-def generate_event_table(events):
-    rows = []
+def load_cache():
+    """Return (meta, nodes, edges) saved by the previous run, or None."""
+    try:
+        meta = loads(CACHE_META.read_bytes())
+        with open(CACHE_GRAPH, "rb") as f:
+            graph_meta, nodes, edges = pickle.load(f)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        return None
+
+    # Both files carry the meta, so a run interrupted between the two writes is detected
+    if meta.get("version") != CACHE_VERSION or graph_meta != meta:
+        return None
+    return meta, nodes, edges
+
+
+def save_cache(events, stats, nodes, edges):
+    CACHE_DIR.mkdir(exist_ok=True)
+    meta = {
+        "version": CACHE_VERSION,
+        "events": len(events),
+        "max_event_id": events[-1].get("event_id", 0) if events else 0,
+        # tee.py stamps every record, so these identify the cached log content
+        "first_time_tee": events[0].get("time_tee") if events else None,
+        "last_time_tee": events[-1].get("time_tee") if events else None,
+        "stats": stats,
+    }
+    write_atomic(CACHE_GRAPH, pickle.dumps((meta, nodes, edges), protocol=pickle.HIGHEST_PROTOCOL))
+    write_atomic(CACHE_META, dumps(meta))
+
+
+def appended_events(events, meta):
+    """Return the events logged since the cached run.
+
+    None means the log was not simply appended to (truncated, replaced, or
+    the REE restarted its event ids) and everything has to be rebuilt.
+    """
+    old_count = meta["events"]
+    if len(events) < old_count:
+        return None
+    if old_count:
+        last = events[old_count - 1]
+        if (
+            last.get("event_id", 0) != meta["max_event_id"]
+            or last.get("time_tee") != meta["last_time_tee"]
+            or events[0].get("time_tee") != meta["first_time_tee"]
+        ):
+            return None
+
+    new_events = events[old_count:]
+    if new_events and new_events[0].get("event_id", 0) <= meta["max_event_id"]:
+        return None
+    return new_events
 
-    for e in events:
 
-        # Each alert gets its own badge
-        alerts = e["alerts"] if e["alerts"] else ["ok"]
+# ------------------------------------------------------------
+# Event Table Rows
+# ------------------------------------------------------------
+@functools.lru_cache(maxsize=4096)
+def _fmt_ts(sec):
+    # Keyed by whole second: events logged in the same second share one string
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec))
 
-        badge_html = "".join([
-            f"<span class='badge' style='background:{COLOR_MAP[a]};margin-right:4px'>{a}</span>"
-            for a in alerts
-        ])
 
-        rows.append(f"""
-        <tr data-alerts="{' '.join(alerts)}">
-            <td>{e['event_id']}</td>
-            <td>{e['device']}</td>
-            <td>{e['actual_state']}</td>
-            <td>{e['reported_state']}</td>
-            <td>{e['network_attempt']}</td>
-            <td>{badge_html}</td>
-            <td>{datetime.fromtimestamp(e['time_tee']).strftime("%Y-%m-%d %H:%M:%S")}</td>
-        </tr>
-        """)
+def alert_mask(alerts):
+    mask = 0
+    for a in alerts:
+        mask |= ALERT_BITS.get(a, 0)
+    return mask
+
 
-    return "\n".join(rows)
+def event_rows(events):
+    """Flatten events into the row arrays rendered by dashboard_shell.html.
+
+    [id, device, physical, reported, network, alerts, mask, tee_time]
+    """
+    rows = []
+
+    # Hot-loop lookups bound to locals once
+    append = rows.append
+    fmt_ts = _fmt_ts
+    mask_of = alert_mask
+
+    for e in events:
+        alerts = e.get("alerts") or []
+        append([
+            e["event_id"],
+            e["device"],
+            e["actual_state"],
+            e["reported_state"],
+            e["network_attempt"],
+            alerts or ["ok"],
+            mask_of(alerts) if alerts else OK_BIT,
+            fmt_ts(int(e["time_tee"])),
+        ])
+
+    return rows
 
 
 # ------------------------------------------------------------
-# HTML Dashboard Template
+# Dashboard Shell + Data
 # ------------------------------------------------------------
-def generate_dashboard(events, stats, graph_file):
-    rows_html = generate_event_table(events)
-
-    html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8">
-<title>IoT Security Auditing Dashboard</title>
-
-<style>
-body {{
-    font-family: Arial, sans-serif;
-    background: #f3f4f6;
-    margin: 0;
-}}
-header {{
-    background: #111827;
-    color: white;
-    padding: 20px;
-}}
-.cards {{
-    display: grid;
-    grid-template-columns: repeat(5, 1fr);
-    gap: 15px;
-    margin: 20px;
-}}
-.card {{
-    background: white;
-    border-radius: 10px;
-    padding: 14px;
-    text-align: center;
-    box-shadow: 0 1px 3px rgba(0,0,0,0.2);
-}}
-.badge {{
-    color: white;
-    padding: 3px 6px;
-    border-radius: 6px;
-    font-size: 0.75em;
-}}
-button.filter {{
-    padding: 8px 12px;
-    border-radius: 6px;
-    border: none;
-    margin-right: 8px;
-    cursor: pointer;
-    color: white;
-}}
-table {{
-    width: 96%;
-    margin: 20px auto;
-    background: white;
-    border-collapse: collapse;
-}}
-th, td {{
-    padding: 8px;
-    border-bottom: 1px solid #ddd;
-}}
-iframe {{
-    border: none;
-    margin: 20px;
-    border-radius: 12px;
-}}
-</style>
-
-</head>
-<body>
-
-<header>
-    <h1>IoT Security Auditing Dashboard</h1>
-</header>
-
-<div class="cards">
-    <div class="card"><h3>Total</h3><p>{stats['total']}</p></div>
-    <div class="card"><h3>OK</h3><p>{stats['ok']}</p></div>
-    <div class="card"><h3>Spoofing</h3><p>{stats['spoofing']}</p></div>
-    <div class="card"><h3>Masking</h3><p>{stats['masking']}</p></div>
-    <div class="card"><h3>TLS Violations</h3><p>{stats['tls_violation']}</p></div>
-</div>
-
-<h2 style="margin-left:20px;">Filters</h2>
-<div style="margin-left:20px;">
-    <button class="filter" onclick="filterTable('all')" style="background:#6366f1;">All</button>
-    <button class="filter" onclick="filterTable('ok')" style="background:{COLOR_MAP['ok']}">OK</button>
-    <button class="filter" onclick="filterTable('spoofing')" style="background:{COLOR_MAP['spoofing']}">Spoofing</button>
-    <button class="filter" onclick="filterTable('masking')" style="background:{COLOR_MAP['masking']}">Masking</button>
-    <button class="filter" onclick="filterTable('tls_violation')" style="background:{COLOR_MAP['tls_violation']}">TLS</button>
-</div>
-
-<table id="eventsTable">
-<thead>
-<tr>
-    <th>ID</th><th>Device</th><th>Physical</th>
-    <th>Reported</th><th>Network</th><th>Alerts</th><th>TEE Time</th>
-</tr>
-</thead>
-<tbody>
-{rows_html}
-</tbody>
-</table>
-
-<div class="pagination" style="text-align:center;margin:10px;">
-<button onclick="prevPage()">Prev</button>
-<span id="pageInfo"></span>
-<button onclick="nextPage()">Next</button>
-</div>
-
-<h2 style="margin-left:20px;">Interactive Provenance Graph</h2>
-<iframe src="{graph_file}" width="96%" height="650px"></iframe>
-
-<script>
-var table = document.getElementById("eventsTable");
-var rows = table.getElementsByTagName("tr");
-var currentPage = 1;
-var pageSize = 20;
-
-function paginate() {{
-    for (var i = 1; i < rows.length; i++) {{
-        rows[i].style.display = "none";
-        if (i > (currentPage - 1) * pageSize && i <= currentPage * pageSize)
-            rows[i].style.display = "";
-    }}
-    document.getElementById("pageInfo").innerHTML =
-        "Page " + currentPage + " / " + Math.ceil((rows.length-1) / pageSize);
-}}
-
-function nextPage() {{
-    if (currentPage * pageSize < rows.length - 1) {{
-        currentPage++;
-        paginate();
-    }}
-}}
-
-function prevPage() {{
-    if (currentPage > 1) {{
-        currentPage--;
-        paginate();
-    }}
-}}
-
-function filterTable(alertType) {{
-    for (var i = 1; i < rows.length; i++) {{
-        let alerts = rows[i].getAttribute("data-alerts");
-        if (alertType === "all" || alerts.includes(alertType))
-            rows[i].style.display = "";
-        else
-            rows[i].style.display = "none";
-    }}
-}}
-
-paginate();
-</script>
-
-</body>
-</html>
-"""
-    return html
+def write_shell():
+    # The shell is static; leave it alone unless it is missing or outdated
+    shell = DASHBOARD_SHELL.read_bytes()
+    output = Path(OUTPUT_HTML)
+    if not output.exists() or output.read_bytes() != shell:
+        write_atomic(OUTPUT_HTML, shell)
+
+
+def generate_data(events, stats):
+    payload = {
+        "stats": stats,
+        "colors": COLOR_MAP,
+        "bits": FILTER_BITS,
+        "rows": event_rows(events),
+    }
+    # Loaded with a plain <script> tag, which also works from file://
+    return b"var DASHBOARD_DATA = " + to_script_json(payload) + b";\n"
 
 
 # ------------------------------------------------------------
@@ -324,15 +374,30 @@ paginate();
 # ------------------------------------------------------------
 def main():
     events = load_events()
-    stats = compute_stats(events)
 
-    print("[INFO] Building provenance graph...")
-    graph_file = build_graph(events)
+    cached = load_cache()
+    new_events = appended_events(events, cached[0]) if cached else None
+
+    rebuilt = new_events is None
+    if rebuilt:
+        stats = compute_stats(events)
+        nodes, edges = [], []
+        new_events = events
+    else:
+        meta, nodes, edges = cached
+        delta = compute_stats(new_events)
+        stats = {k: meta["stats"][k] + delta[k] for k in delta}
+
+    if rebuilt or new_events or not Path(GRAPH_HTML).exists():
+        print("[INFO] Building provenance graph...")
+        build_graph(new_events, nodes, edges)
+        save_cache(events, stats, nodes, edges)
+    else:
+        print("[INFO] No new events, reusing provenance graph...")
 
     print("[INFO] Building dashboard...")
-    html = generate_dashboard(events, stats, graph_file)
-
-    Path(OUTPUT_HTML).write_text(html, encoding="utf-8")
+    write_shell()
+    write_atomic(OUTPUT_DATA, generate_data(events, stats))
     print(f"[INFO] Dashboard generated: {OUTPUT_HTML}")
 
 
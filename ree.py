@@ -9,11 +9,13 @@ Generates:
   - Random network connection attempts (TLS and non-TLS)
 """
 
-import json
-import random
+import struct
 import sys
 import time
 
+import msgpack
+import numpy as np
+
 
 SECURE_ENDPOINTS = [
     "https://api.secure-server.com/upload",
@@ -27,39 +29,59 @@ INSECURE_ENDPOINTS = [
     "ws://stream.local/feed"
 ]
 
+# Each event goes out as a 4-byte big-endian length followed by msgpack
+FRAME_HEADER = struct.Struct(">I")
+
+# Random numbers are drawn from numpy this many events at a time
+RNG_BATCH = 4096
+
+
+def random_draws(batch=RNG_BATCH):
+    """Yield per-event random draws, refilled from numpy in batches.
+
+    Each item is (r_physical, r_spoof, r_network, secure_idx, insecure_idx).
+    """
+    rng = np.random.default_rng()
+    while True:
+        r = rng.random((3, batch))
+        secure_idx = rng.integers(0, len(SECURE_ENDPOINTS), batch)
+        insecure_idx = rng.integers(0, len(INSECURE_ENDPOINTS), batch)
+        yield from zip(*r.tolist(), secure_idx.tolist(), insecure_idx.tolist())
+
 
-def update_physical_state(current):
-    if random.random() < 0.25:
+def update_physical_state(current, r):
+    if r < 0.25:
         return "camera_on" if current == "camera_off" else "camera_off"
     return current
 
 
-def generate_reported_state(actual):
-    if actual == "camera_on" and random.random() < 0.40:
+def generate_reported_state(actual, r):
+    if actual == "camera_on" and r < 0.40:
         return "camera_off", True
     return actual, False
 
 
-def generate_network_attempt():
+def generate_network_attempt(r, secure_idx, insecure_idx):
     """Simulate both secure and insecure outbound traffic."""
-    if random.random() < 0.5:
-        return random.choice(INSECURE_ENDPOINTS)
-    return random.choice(SECURE_ENDPOINTS)
+    if r < 0.5:
+        return INSECURE_ENDPOINTS[insecure_idx]
+    return SECURE_ENDPOINTS[secure_idx]
 
 
 def main():
     print("[REE] Device simulator running...", file=sys.stderr)
     event_id = 0
     physical_state = "camera_off"
+    out = sys.stdout.buffer
 
     try:
-        while True:
+        for r_phys, r_spoof, r_net, secure_idx, insecure_idx in random_draws():
             time.sleep(1.0)
             event_id += 1
 
-            physical_state = update_physical_state(physical_state)
-            reported_state, spoof = generate_reported_state(physical_state)
-            connection = generate_network_attempt()
+            physical_state = update_physical_state(physical_state, r_phys)
+            reported_state, spoof = generate_reported_state(physical_state, r_spoof)
+            connection = generate_network_attempt(r_net, secure_idx, insecure_idx)
 
             event = {
                 "event_id": event_id,
@@ -71,7 +93,9 @@ def main():
                 "spoof_attempt": spoof
             }
 
-            print(json.dumps(event), flush=True)
+            payload = msgpack.packb(event)
+            out.write(FRAME_HEADER.pack(len(payload)) + payload)
+            out.flush()
 
             dbg = f"[REE] event={event_id:03d} actual={physical_state} reported={reported_state} conn={connection}"
             if spoof:
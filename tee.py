@@ -11,75 +11,157 @@ Detects:
 Logs audit records to audit_log.jsonl
 """
 
-import json
+import signal
+import struct
 import sys
 import time
 
+import msgpack
+
+try:
+    import orjson
+
+    def encode_record(record):
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+except ImportError:
+    import json
+
+    def encode_record(record):
+        return (json.dumps(record, separators=(",", ":")) + "\n").encode()
+
 AUDIT_LOG = "audit_log.jsonl"
 
-last_physical = None
-last_reported = None
+# The audit log is block-buffered and flushed after this many records,
+# or once this many seconds have passed since the last flush
+FLUSH_EVERY = 100
+FLUSH_INTERVAL = 1.0
+
+# Frame header written by ree.py: 4-byte big-endian payload length
+FRAME_HEADER = struct.Struct(">I")
+READ_CHUNK = 64 * 1024
+
+# Events are a few hundred bytes; a larger header means the stream is corrupt
+MAX_FRAME = 64 * 1024
+
+INSECURE_PREFIXES = ("http://", "mqtt://", "ws://")
+INSECURE_PREFIX_LEN = max(map(len, INSECURE_PREFIXES))
 
 
-def detect_spoofing(actual, reported):
-    return actual != reported
+def make_auditor():
+    """Return check(actual, reported, url) -> (spoofing, masking, tls_violation).
 
+    Masking compares each event with the previous one, so the last
+    physical/reported states live in the closure instead of module globals.
+    """
+    last_physical = None
+    last_reported = None
 
-def detect_masking(actual, reported):
-    global last_physical, last_reported
+    def check(actual, reported, url):
+        nonlocal last_physical, last_reported
+
+        spoofing = actual != reported
+
+        # Physical state changed but the reported state did not
+        masking = (
+            last_physical is not None
+            and actual != last_physical
+            and reported == last_reported
+        )
 
-    if last_physical is None:
         last_physical = actual
         last_reported = reported
-        return False
 
-    physical_changed = actual != last_physical
-    reported_changed = reported != last_reported
+        # Only the scheme matters, so lowercase just the prefix instead of the URL
+        tls = url[:INSECURE_PREFIX_LEN].lower().startswith(INSECURE_PREFIXES)
+
+        return spoofing, masking, tls
 
-    last_physical = actual
-    last_reported = reported
+    return check
 
-    return physical_changed and not reported_changed
 
+def read_frames(stream):
+    """Yield msgpack payloads from a length-prefixed byte stream.
 
-def tls_violation(url):
-    url = url.lower()
-    insecure_prefixes = ("http://", "mqtt://", "ws://")
-    return url.startswith(insecure_prefixes)
+    Whatever is available is read in chunks of up to READ_CHUNK bytes and
+    every complete frame is sliced out of a single bytearray; a trailing
+    partial frame stays buffered until the next chunk arrives.
+
+    A header announcing more than MAX_FRAME bytes cannot be resynced from,
+    so it ends the stream instead of buffering input without bound.
+    """
+    buf = bytearray()
+
+    while True:
+        chunk = stream.read1(READ_CHUNK)
+        if not chunk:
+            if buf:
+                print(
+                    f"[TEE] Truncated frame at end of input ({len(buf)} bytes dropped).",
+                    file=sys.stderr,
+                )
+            return
+        buf += chunk
+
+        pos = 0
+        while len(buf) - pos >= FRAME_HEADER.size:
+            (length,) = FRAME_HEADER.unpack_from(buf, pos)
+            if length > MAX_FRAME:
+                print(
+                    f"[TEE] Frame of {length} bytes exceeds {MAX_FRAME}; stream corrupt, stopping.",
+                    file=sys.stderr,
+                )
+                return
+
+            start = pos + FRAME_HEADER.size
+            end = start + length
+            if end > len(buf):
+                break
+
+            yield bytes(buf[start:end])
+            pos = end
+
+        del buf[:pos]
 
 
 def main():
     print("[TEE] Auditor running...", file=sys.stderr)
 
+    # Stop on SIGTERM like on Ctrl+C, so buffered records still get written
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    check = make_auditor()
+
     try:
-        with open(AUDIT_LOG, "a", buffering=1) as logf:
-            for line in sys.stdin:
-                if not line.strip():
-                    continue
+        with open(AUDIT_LOG, "ab", buffering=65536) as logf:
+            unflushed = 0
+            last_flush = time.time()
 
+            for payload in read_frames(sys.stdin.buffer):
                 try:
-                    event = json.loads(line)
-                except json.JSONDecodeError:
-                    print("[TEE] Invalid JSON.", file=sys.stderr)
+                    event = msgpack.unpackb(payload)
+                except ValueError:
+                    print("[TEE] Invalid event.", file=sys.stderr)
                     continue
 
                 actual = event["actual_state"]
                 reported = event["reported_state"]
                 connection = event["network_attempt"]
 
+                spoofing, masking, tls = check(actual, reported, connection)
                 alerts = []
 
-                if detect_spoofing(actual, reported):
+                if spoofing:
                     alerts.append("spoofing")
 
-                if detect_masking(actual, reported):
+                if masking:
                     alerts.append("masking")
 
-                if tls_violation(connection):
+                if tls:
                     alerts.append("tls_violation")
 
+                now = time.time()
                 record = {
-                    "time_tee": time.time(),
+                    "time_tee": now,
                     "event_id": event["event_id"],
                     "device": event["device"],
                     "actual_state": actual,
@@ -88,7 +170,12 @@ def main():
                     "alerts": alerts,
                 }
 
-                logf.write(json.dumps(record) + "\n")
+                logf.write(encode_record(record))
+                unflushed += 1
+                if unflushed >= FLUSH_EVERY or now - last_flush >= FLUSH_INTERVAL:
+                    logf.flush()
+                    unflushed = 0
+                    last_flush = now
 
                 status = "OK" if not alerts else ", ".join(alerts)
                 print(